@@ -91,11 +91,13 @@ app = FastAPI(title="Cogni Anchor API", description="Backend API for cognitive h
 
 # Import and include chatbot router
 from app.chatbot import router as chatbot_router
+from app.services.stt_service import preload_stt_model
 app.include_router(chatbot_router)
 
 @app.on_event("startup")
 def startup_event():
     logger.info("Application startup initiated.")
+    preload_stt_model()
     try:
         conn = engine.connect()
         conn.close()
@@ -37,6 +37,7 @@ from app.routes.reminders import router as reminders_router
 from app.routes.users_pairs import router as users_pairs_router
 from app.routes.face_recognition import router as face_router
 from app.routes.agent import router as agent_router
+from app.services.stt_service import preload_stt_model
 
 app.include_router(chatbot_router)
 app.include_router(reminders_router)
@@ -46,6 +47,8 @@ app.include_router(agent_router)
 
 @app.on_event("startup")
 def startup_event():
+    # Load the local Whisper model in the background so the first voice request is fast
+    preload_stt_model()
     logger.info("CogniAnchor Complete API startup complete!")
     logger.info("API documentation available at: http://localhost:8000/docs")
     logger.info("Features: Chatbot, LangGraph Agent, Face Recognition, Reminders, User Management")
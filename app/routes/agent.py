@@ -5,12 +5,16 @@ Intelligent chatbot with tool-calling capabilities
 
 import logging
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
+from langchain_core.messages import HumanMessage, AIMessage
 from app.services.langgraph_agent import (
     run_agent,
+    stream_agent,
     get_agent_history,
-    add_to_agent_history
+    add_to_agent_history,
+    clear_agent_history as clear_history
 )
 
 logger = logging.getLogger("AgentAPI")
@@ -65,7 +69,7 @@ async def agent_chat(request: AgentChatRequest):
         logger.info(f"Agent chat request from patient {request.patient_id}: {request.message}")
 
         # Get conversation history
-        history = get_agent_history(request.patient_id)
+        history = await get_agent_history(request.patient_id)
 
         # Run the agent
         response = await run_agent(
@@ -76,8 +80,11 @@ async def agent_chat(request: AgentChatRequest):
         )
 
         # Update conversation history
-        add_to_agent_history(request.patient_id, "user", request.message)
-        add_to_agent_history(request.patient_id, "assistant", response)
+        await add_to_agent_history(
+            request.patient_id,
+            HumanMessage(content=request.message),
+            AIMessage(content=response)
+        )
 
         logger.info(f"Agent response generated successfully for patient {request.patient_id}")
 
@@ -95,6 +102,54 @@ async def agent_chat(request: AgentChatRequest):
         )
 
 
+@router.post("/chat/stream")
+async def agent_chat_stream(request: AgentChatRequest):
+    """
+    Chat with the LangGraph agent, streaming the response as plain text
+
+    Same request body as /chat. The response body is the agent's reply, sent
+    chunk by chunk as it is generated, so the client can start showing (or
+    speaking) it before the full reply is ready.
+    """
+    try:
+        logger.info(f"Agent stream request from patient {request.patient_id}: {request.message}")
+
+        # Get conversation history
+        history = await get_agent_history(request.patient_id)
+
+    except Exception as e:
+        logger.error(f"Error in agent chat stream: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process agent chat: {str(e)}"
+        )
+
+    async def response_stream():
+        reply = None
+        async for chunk in stream_agent(
+            patient_id=request.patient_id,
+            pair_id=request.pair_id,
+            message=request.message,
+            conversation_history=history
+        ):
+            # The last item is the full reply (same one /chat stores), not streamed text
+            if isinstance(chunk, AIMessage):
+                reply = chunk
+                continue
+            yield chunk
+
+        # Update conversation history once the full reply is known
+        await add_to_agent_history(
+            request.patient_id,
+            HumanMessage(content=request.message),
+            reply
+        )
+
+        logger.info(f"Agent response streamed successfully for patient {request.patient_id}")
+
+    return StreamingResponse(response_stream(), media_type="text/plain")
+
+
 @router.delete("/history/{patient_id}")
 async def clear_agent_history(patient_id: str):
     """
@@ -109,11 +164,8 @@ async def clear_agent_history(patient_id: str):
     }
     """
     try:
-        from app.services.langgraph_agent import agent_conversations
-
-        if patient_id in agent_conversations:
-            agent_conversations[patient_id] = []
-            logger.info(f"Cleared agent history for patient {patient_id}")
+        await clear_history(patient_id)
+        logger.info(f"Cleared agent history for patient {patient_id}")
 
         return {
             "message": "Conversation history cleared",
@@ -151,6 +203,7 @@ async def agent_health_check():
         ],
         "tools": [
             "create_reminder",
+            "create_reminders_bulk",
             "list_reminders",
             "delete_reminder",
             "send_emergency_alert"
@@ -15,6 +15,7 @@ from app.models.database_models import (
     ReminderListResponse,
     SuccessResponse
 )
+from app.services.reminder_time import parse_reminder_datetime
 from app.services.supabase_client import get_supabase_client
 
 logger = logging.getLogger("RemindersAPI")
@@ -22,24 +23,6 @@ router = APIRouter(prefix="/api/v1/reminders", tags=["Reminders"])
 
 # === Helper Functions ===
 
-def parse_reminder_datetime(date_str: str, time_str: str) -> datetime:
-    """
-    Parse reminder date and time strings to datetime object
-
-    Args:
-        date_str: Date in format 'dd MMM yyyy' (e.g., '25 Dec 2024')
-        time_str: Time in format 'hh:mm a' (e.g., '02:30 PM')
-
-    Returns:
-        datetime object
-    """
-    try:
-        datetime_str = f"{date_str} {time_str}"
-        return datetime.strptime(datetime_str, "%d %b %Y %I:%M %p")
-    except Exception as e:
-        logger.error(f"Error parsing datetime: {e}")
-        raise ValueError(f"Invalid date/time format: {e}")
-
 def is_reminder_expired(date_str: str, time_str: str) -> bool:
     """Check if reminder is expired"""
     try:
@@ -65,7 +48,7 @@ async def create_reminder(reminder: ReminderCreate):
 
         # Validate date/time format
         try:
-            parse_reminder_datetime(reminder.date, reminder.time)
+            scheduled_at = parse_reminder_datetime(reminder.date, reminder.time)
         except ValueError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -79,7 +62,8 @@ async def create_reminder(reminder: ReminderCreate):
             "pair_id": reminder.pair_id,
             "title": reminder.title,
             "date": reminder.date,
-            "time": reminder.time
+            "time": reminder.time,
+            "scheduled_at": scheduled_at.isoformat()
         }).execute()
 
         if not result.data or len(result.data) == 0:
@@ -115,22 +99,18 @@ async def get_reminders(pair_id: str, include_expired: bool = False):
 
         supabase = get_supabase_client()
 
-        # Fetch reminders from database
-        result = supabase.table("reminders") \
+        # Fetch reminders from database (expired ones filtered in SQL unless requested)
+        query = supabase.table("reminders") \
             .select("*") \
-            .eq("pair_id", pair_id) \
-            .order("date", desc=False) \
-            .order("time", desc=False) \
-            .execute()
-
-        reminders = [ReminderInfo(**reminder) for reminder in result.data]
+            .eq("pair_id", pair_id)
 
-        # Filter out expired reminders if requested
         if not include_expired:
-            reminders = [
-                r for r in reminders
-                if not is_reminder_expired(r.date, r.time)
-            ]
+            # Rows whose date/time couldn't be parsed have no scheduled_at; keep them listed
+            query = query.or_(f"scheduled_at.gte.{datetime.now().isoformat()},scheduled_at.is.null")
+
+        result = query.order("scheduled_at", desc=False).execute()
+
+        reminders = [ReminderInfo(**reminder) for reminder in result.data]
 
         logger.info(f"Found {len(reminders)} reminder(s) for pair {pair_id}")
 
@@ -7,6 +7,9 @@ import logging
 from typing import Optional, List
 from datetime import datetime
 from langchain_core.tools import tool
+from postgrest import ReturnMethod
+from pydantic import BaseModel, Field
+from app.services.reminder_time import parse_reminder_datetime
 from app.services.supabase_client import get_supabase_client
 
 logger = logging.getLogger("AgentTools")
@@ -37,25 +40,22 @@ def create_reminder(pair_id: str, title: str, date: str, time: str) -> str:
 
         # Validate date/time format
         try:
-            datetime.strptime(f"{date} {time}", "%d %b %Y %I:%M %p")
+            scheduled_at = parse_reminder_datetime(date, time)
         except ValueError as e:
             return f"Error: Invalid date/time format. Please use 'dd MMM yyyy' for date and 'hh:mm AM/PM' for time. Error: {e}"
 
         supabase = get_supabase_client()
 
-        # Insert reminder
-        result = supabase.table("reminders").insert({
+        # Insert reminder (no row echoed back - execute() raises on failure)
+        supabase.table("reminders").insert({
             "pair_id": pair_id,
             "title": title,
             "date": date,
-            "time": time
-        }).execute()
-
-        if not result.data or len(result.data) == 0:
-            return "Error: Failed to create reminder in database"
+            "time": time,
+            "scheduled_at": scheduled_at.isoformat()
+        }, returning=ReturnMethod.minimal).execute()
 
-        reminder_id = result.data[0]["id"]
-        logger.info(f"Reminder created successfully with ID: {reminder_id}")
+        logger.info(f"Reminder created successfully for pair {pair_id}")
 
         return f"Reminder created successfully! I'll remind you about '{title}' on {date} at {time}."
 
@@ -64,6 +64,80 @@ def create_reminder(pair_id: str, title: str, date: str, time: str) -> str:
         return f"Error: Failed to create reminder - {str(e)}"
 
 
+class ReminderItem(BaseModel):
+    """A single reminder inside a create_reminders_bulk call"""
+    title: str = Field(description="What to remind about (e.g., 'Take medicine')")
+    date: str = Field(description="Date in format 'dd MMM yyyy' (e.g., '25 Dec 2024')")
+    time: str = Field(description="Time in format 'hh:mm AM/PM' (e.g., '08:00 PM')")
+
+
+@tool
+def create_reminders_bulk(pair_id: str, items: List[ReminderItem]) -> str:
+    """
+    Create several reminders for the patient at once.
+
+    Use this tool instead of calling create_reminder repeatedly when the patient mentions
+    more than one reminder in the same message.
+
+    Args:
+        pair_id: The patient-caretaker pair ID
+        items: The reminders to create, each with title, date ('dd MMM yyyy') and time ('hh:mm AM/PM')
+
+    Returns:
+        Success or error message
+
+    Examples:
+        - "Remind me to take my pills at 8am and call my son at 6pm today" ->
+          create_reminders_bulk(pair_id, [
+              {"title": "Take pills", "date": "25 Dec 2024", "time": "08:00 AM"},
+              {"title": "Call son", "date": "25 Dec 2024", "time": "06:00 PM"}
+          ])
+    """
+    try:
+        logger.info(f"Creating {len(items)} reminder(s) for pair {pair_id}")
+
+        if not items:
+            return "Error: No reminders were given to create."
+
+        # Tool calls from the LLM may arrive as plain dicts
+        items = [ReminderItem.model_validate(item) for item in items]
+
+        # Validate every date/time before writing anything
+        rows = []
+        invalid = []
+        for item in items:
+            try:
+                scheduled_at = parse_reminder_datetime(item.date, item.time)
+            except ValueError:
+                invalid.append(f"'{item.title}' ({item.date} {item.time})")
+                continue
+
+            rows.append({
+                "pair_id": pair_id,
+                "title": item.title,
+                "date": item.date,
+                "time": item.time,
+                "scheduled_at": scheduled_at.isoformat()
+            })
+
+        if invalid:
+            return f"Error: Invalid date/time format for {', '.join(invalid)}. Please use 'dd MMM yyyy' for date and 'hh:mm AM/PM' for time."
+
+        supabase = get_supabase_client()
+
+        # One multi-row insert for all reminders
+        supabase.table("reminders").insert(rows, returning=ReturnMethod.minimal).execute()
+
+        logger.info(f"Created {len(items)} reminder(s) for pair {pair_id}")
+
+        summary = "; ".join(f"'{item.title}' on {item.date} at {item.time}" for item in items)
+        return f"Created {len(items)} reminders successfully! I'll remind you about {summary}."
+
+    except Exception as e:
+        logger.error(f"Error creating reminders: {e}")
+        return f"Error: Failed to create reminders - {str(e)}"
+
+
 @tool
 def list_reminders(pair_id: str) -> str:
     """
@@ -87,34 +161,19 @@ def list_reminders(pair_id: str) -> str:
 
         supabase = get_supabase_client()
 
-        # Fetch reminders
+        # Fetch only upcoming reminders (expired ones are filtered in the database;
+        # rows with an unparseable date/time have no scheduled_at and are kept)
         result = supabase.table("reminders") \
-            .select("*") \
+            .select("id,title,date,time") \
             .eq("pair_id", pair_id) \
-            .order("date", desc=False) \
-            .order("time", desc=False) \
+            .or_(f"scheduled_at.gte.{datetime.now().isoformat()},scheduled_at.is.null") \
+            .order("scheduled_at", desc=False) \
             .execute()
 
-        if not result.data or len(result.data) == 0:
-            return "You don't have any reminders set right now."
-
-        # Filter out expired reminders
-        now = datetime.now()
-        upcoming_reminders = []
-
-        for reminder in result.data:
-            try:
-                reminder_dt = datetime.strptime(
-                    f"{reminder['date']} {reminder['time']}",
-                    "%d %b %Y %I:%M %p"
-                )
-                if reminder_dt >= now:
-                    upcoming_reminders.append(reminder)
-            except:
-                continue
+        upcoming_reminders = result.data
 
         if not upcoming_reminders:
-            return "All your reminders have passed. You don't have any upcoming reminders."
+            return "You don't have any upcoming reminders right now."
 
         # Format reminders as a friendly list
         reminder_list = []
@@ -153,35 +212,27 @@ def delete_reminder(pair_id: str, reminder_title: str) -> str:
 
         supabase = get_supabase_client()
 
-        # Find reminders matching the title
-        result = supabase.table("reminders") \
-            .select("*") \
-            .eq("pair_id", pair_id) \
-            .execute()
-
-        if not result.data:
-            return "You don't have any reminders to delete."
+        # Match (case-insensitive partial) and delete in one round trip.
+        # The function only deletes when exactly one reminder matches.
+        result = supabase.rpc("delete_reminder_by_title", {
+            "p_pair": pair_id,
+            "p_needle": reminder_title
+        }).execute()
 
-        # Find matching reminders (case-insensitive partial match)
-        matching_reminders = [
-            r for r in result.data
-            if reminder_title.lower() in r["title"].lower()
-        ]
+        matching_reminders = result.data or []
 
         if not matching_reminders:
             return f"I couldn't find a reminder matching '{reminder_title}'. Please check the reminder title and try again."
 
-        if len(matching_reminders) > 1:
+        if len(matching_reminders) > 1 or not matching_reminders[0]["deleted"]:
             titles = [r["title"] for r in matching_reminders]
             return f"Found multiple reminders matching '{reminder_title}': {', '.join(titles)}. Please be more specific."
 
-        # Delete the matching reminder
-        reminder_to_delete = matching_reminders[0]
-        supabase.table("reminders").delete().eq("id", reminder_to_delete["id"]).execute()
+        deleted_reminder = matching_reminders[0]
 
-        logger.info(f"Deleted reminder: {reminder_to_delete['title']}")
+        logger.info(f"Deleted reminder: {deleted_reminder['title']}")
 
-        return f"I've deleted the reminder '{reminder_to_delete['title']}' scheduled for {reminder_to_delete['date']} at {reminder_to_delete['time']}."
+        return f"I've deleted the reminder '{deleted_reminder['title']}' scheduled for {deleted_reminder['date']} at {deleted_reminder['time']}."
 
     except Exception as e:
         logger.error(f"Error deleting reminder: {e}")
@@ -3,15 +3,29 @@ LangGraph Agent for CogniAnchor
 Intelligent agent with tool-calling capabilities for dementia care
 """
 
+import functools
+import json
 import logging
 import os
-from typing import TypedDict, Annotated, Sequence
+import threading
+from collections import deque
+from typing import TypedDict, Annotated, Sequence, AsyncIterator, Union
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
+from langchain_core.messages import (
+    BaseMessage,
+    HumanMessage,
+    AIMessage,
+    ToolMessage,
+    message_to_dict,
+    messages_from_dict
+)
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableConfig
 from langchain_google_genai import ChatGoogleGenerativeAI
 from app.services.agent_tools import (
     create_reminder,
+    create_reminders_bulk,
     list_reminders,
     delete_reminder,
     send_emergency_alert
@@ -41,12 +55,14 @@ Your role:
 
 Available Tools:
 1. create_reminder: Set reminders for medication, appointments, tasks
-2. list_reminders: Show upcoming reminders
-3. delete_reminder: Cancel/remove reminders
-4. send_emergency_alert: Alert caregiver if patient is in danger (USE SPARINGLY - only for real emergencies)
+2. create_reminders_bulk: Set several reminders at once
+3. list_reminders: Show upcoming reminders
+4. delete_reminder: Cancel/remove reminders
+5. send_emergency_alert: Alert caregiver if patient is in danger (USE SPARINGLY - only for real emergencies)
 
 Guidelines:
 - Always use tools when the patient asks for reminder-related actions
+- If the patient mentions more than one reminder, use create_reminders_bulk once instead of create_reminder several times
 - Be proactive: If patient mentions taking medicine or appointments, suggest creating a reminder
 - Never show frustration or correct the patient harshly
 - Validate their feelings and provide reassurance
@@ -55,17 +71,31 @@ Guidelines:
 
 Examples:
 - Patient: "Remind me to take my pills at 8pm" -> Use create_reminder tool
+- Patient: "Remind me to take my pills at 8am and call my son at 6pm" -> Use create_reminders_bulk tool
 - Patient: "What do I need to do today?" -> Use list_reminders tool
 - Patient: "Cancel my appointment reminder" -> Use delete_reminder tool
 - Patient: "I fell and I can't get up" -> Use send_emergency_alert tool immediately
 - Patient: "I'm feeling sad" -> Provide emotional support (no tool needed)
 """
 
+# System prompt is attached once here; call_agent only supplies the conversation
+AGENT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", AGENT_SYSTEM_PROMPT),
+    MessagesPlaceholder("messages")
+])
+
 
 # === Initialize LLM with Tools ===
 
-def create_agent_llm():
-    """Create LLM with tool binding"""
+# Built once per process and reused across requests
+_LLM_WITH_TOOLS = None
+_TOOLS = None
+_AGENT_GRAPH = None
+_AGENT_LOCK = threading.RLock()  # re-entrant: graph build also builds the LLM
+
+
+def _build_llm():
+    """Create LLM with tool binding (expensive - use get_llm_and_tools())"""
     try:
         gemini_api_key = os.getenv("GEMINI_API_KEY")
 
@@ -81,7 +111,7 @@ def create_agent_llm():
         )
 
         # Bind tools to the LLM
-        tools = [create_reminder, list_reminders, delete_reminder, send_emergency_alert]
+        tools = [create_reminder, create_reminders_bulk, list_reminders, delete_reminder, send_emergency_alert]
         llm_with_tools = llm.bind_tools(tools)
 
         logger.info("Agent LLM initialized successfully with Gemini and tools")
@@ -92,22 +122,32 @@ def create_agent_llm():
         raise
 
 
+def get_llm_and_tools():
+    """Get the tool-bound LLM and its tools (built once per process)"""
+    global _LLM_WITH_TOOLS, _TOOLS
+
+    if _LLM_WITH_TOOLS is not None:
+        return _LLM_WITH_TOOLS, _TOOLS
+
+    with _AGENT_LOCK:
+        if _LLM_WITH_TOOLS is None:
+            _LLM_WITH_TOOLS, _TOOLS = _build_llm()
+
+        return _LLM_WITH_TOOLS, _TOOLS
+
+
 # === Agent Nodes ===
 
-def call_agent(state: AgentState):
+async def call_agent(state: AgentState, config: RunnableConfig, *, chain):
     """
     Agent node: Calls the LLM to decide next action
+
+    `chain` (prompt | tool-bound LLM) is bound once at graph build time.
     """
     try:
-        llm_with_tools, _ = create_agent_llm()
-
-        # Build messages with system prompt
-        messages = [
-            {"role": "system", "content": AGENT_SYSTEM_PROMPT}
-        ] + state["messages"]
-
-        # Call LLM
-        response = llm_with_tools.invoke(messages)
+        # Call LLM (prompt template prepends the system prompt).
+        # Passing config through lets astream_events see the model's token stream.
+        response = await chain.ainvoke({"messages": state["messages"]}, config)
 
         logger.info(f"Agent response: {response.content if hasattr(response, 'content') else 'Tool call'}")
 
@@ -142,21 +182,29 @@ def should_continue(state: AgentState):
 
 def create_agent_graph():
     """
-    Create the LangGraph agent workflow
+    Create the LangGraph agent workflow (compiled once, then cached)
 
     Graph structure:
     START -> agent -> [should_continue] -> tools -> agent -> END
                                         -> END
     """
+    global _AGENT_GRAPH
+
+    if _AGENT_GRAPH is not None:
+        return _AGENT_GRAPH
+
     try:
-        # Get tools for ToolNode
-        _, tools = create_agent_llm()
+        # Get the (cached) LLM and its tools
+        llm_with_tools, tools = get_llm_and_tools()
+        chain = AGENT_PROMPT | llm_with_tools
 
         # Create the graph
         workflow = StateGraph(AgentState)
 
         # Add nodes
-        workflow.add_node("agent", call_agent)
+        # When run async, ToolNode dispatches all tool calls of one LLM response
+        # concurrently (asyncio.gather; sync tools each run on a worker thread)
+        workflow.add_node("agent", functools.partial(call_agent, chain=chain))
         workflow.add_node("tools", ToolNode(tools))
 
         # Set entry point
@@ -176,18 +224,61 @@ def create_agent_graph():
         workflow.add_edge("tools", "agent")
 
         # Compile the graph
-        app = workflow.compile()
+        _AGENT_GRAPH = workflow.compile()
 
         logger.info("Agent graph created successfully")
-        return app
+        return _AGENT_GRAPH
 
     except Exception as e:
         logger.error(f"Failed to create agent graph: {e}")
         raise
 
 
+def get_or_build_agent():
+    """Return the compiled agent graph, building it on first use"""
+    if _AGENT_GRAPH is not None:
+        return _AGENT_GRAPH
+
+    with _AGENT_LOCK:
+        return create_agent_graph()
+
+
 # === Agent Execution ===
 
+def _build_initial_state(patient_id: str, pair_id: str, message: str, conversation_history: list = None) -> dict:
+    """Build the graph input from the conversation history and the new user message"""
+    # History already holds message objects; just append the current message
+    messages = list(conversation_history or []) + [HumanMessage(content=message)]
+
+    return {
+        "messages": messages,
+        "pair_id": pair_id,
+        "patient_id": patient_id
+    }
+
+
+def _chunk_text(chunk) -> str:
+    """Extract the text of a streamed model chunk (content may be a str or a list of parts)"""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in content
+    )
+
+
+def _final_reply(messages: Sequence[BaseMessage]) -> str:
+    """The agent's reply in a finished run: the last AI message with text"""
+    for msg in reversed(messages):
+        if isinstance(msg, AIMessage) and msg.content:
+            return msg.content
+
+    # Fallback if no AI message found
+    logger.warning("No AI response found in final state")
+    return "I'm here to help. What would you like to know?"
+
+
 async def run_agent(patient_id: str, pair_id: str, message: str, conversation_history: list = None) -> str:
     """
     Run the agent with a user message
@@ -196,7 +287,7 @@ async def run_agent(patient_id: str, pair_id: str, message: str, conversation_hi
         patient_id: Patient identifier
         pair_id: Patient-caretaker pair ID
         message: User's message
-        conversation_history: Previous conversation messages (optional)
+        conversation_history: Previous conversation messages as HumanMessage/AIMessage (optional)
 
     Returns:
         Agent's response text
@@ -204,71 +295,159 @@ async def run_agent(patient_id: str, pair_id: str, message: str, conversation_hi
     try:
         logger.info(f"Running agent for patient {patient_id}: {message}")
 
-        # Create agent graph
-        agent = create_agent_graph()
+        # Reuse the cached agent graph
+        agent = get_or_build_agent()
+
+        initial_state = _build_initial_state(patient_id, pair_id, message, conversation_history)
+
+        # Run the agent (async, so the event loop isn't blocked and tool calls run concurrently)
+        final_state = await agent.ainvoke(initial_state)
+
+        # Extract final response (the last AI message)
+        reply = _final_reply(final_state["messages"])
+        logger.info(f"Agent completed successfully")
+        return reply
+
+    except Exception as e:
+        logger.error(f"Error running agent: {e}")
+        return "I'm having some trouble right now, but I'm here with you. How can I help?"
+
 
-        # Build initial state
-        messages = []
+async def stream_agent(
+    patient_id: str,
+    pair_id: str,
+    message: str,
+    conversation_history: list = None
+) -> AsyncIterator[Union[str, AIMessage]]:
+    """
+    Run the agent with a user message, yielding the response text as it is produced
+
+    Same inputs as run_agent; tool calls still run in between. Each model call's
+    text is held until that call finishes and only sent if it requested no tools,
+    so text spoken before a tool call (which never reaches run_agent's reply) is
+    never streamed.
 
-        # Add conversation history if provided
-        if conversation_history:
-            for msg in conversation_history:
-                if msg["role"] == "user":
-                    messages.append(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    messages.append(AIMessage(content=msg["content"]))
+    Yields:
+        Chunks of the agent's response text (str), then one final AIMessage holding
+        the full reply - the same reply run_agent would return, for the history
+    """
+    try:
+        logger.info(f"Streaming agent for patient {patient_id}: {message}")
 
-        # Add current message
-        messages.append(HumanMessage(content=message))
+        agent = get_or_build_agent()
+        initial_state = _build_initial_state(patient_id, pair_id, message, conversation_history)
 
-        initial_state = {
-            "messages": messages,
-            "pair_id": pair_id,
-            "patient_id": patient_id
-        }
+        streamed_any = False
+        pending_text = {}
+        reply = None
 
-        # Run the agent
-        final_state = agent.invoke(initial_state)
+        async for event in agent.astream_events(initial_state, version="v2"):
+            kind = event["event"]
 
-        # Extract final response
-        final_messages = final_state["messages"]
+            # The graph's own end event carries the final state
+            if kind == "on_chain_end" and not event.get("parent_ids"):
+                output = event["data"].get("output")
+                if isinstance(output, dict) and "messages" in output:
+                    reply = _final_reply(output["messages"])
+                continue
 
-        # Get the last AI message
-        for msg in reversed(final_messages):
-            if isinstance(msg, AIMessage) and msg.content:
-                logger.info(f"Agent completed successfully")
-                return msg.content
+            if kind == "on_chat_model_stream":
+                text = _chunk_text(event["data"]["chunk"])
+                if text:
+                    pending_text.setdefault(event["run_id"], []).append(text)
+                continue
 
-        # Fallback if no AI message found
-        logger.warning("No AI response found in final state")
-        return "I'm here to help. What would you like to know?"
+            if kind != "on_chat_model_end":
+                continue
+
+            # A model call that requested tools isn't the answer: drop its text
+            texts = pending_text.pop(event["run_id"], [])
+            if getattr(event["data"].get("output"), "tool_calls", None):
+                continue
+
+            for text in texts:
+                streamed_any = True
+                yield text
+
+        if reply is None:
+            logger.warning("No final state received from agent stream")
+            reply = "I'm here to help. What would you like to know?"
+
+        if not streamed_any:
+            logger.warning("No AI response streamed")
+            yield reply
+
+        yield AIMessage(content=reply)
 
     except Exception as e:
-        logger.error(f"Error running agent: {e}")
-        return "I'm having some trouble right now, but I'm here with you. How can I help?"
+        logger.error(f"Error streaming agent: {e}")
+        fallback = "I'm having some trouble right now, but I'm here with you. How can I help?"
+        yield fallback
+        yield AIMessage(content=fallback)
 
 
-# === Conversation Memory (In-Memory for now) ===
+# === Conversation Memory ===
+
+# Shared Redis store when REDIS_URL is set (needed with multiple workers),
+# otherwise a per-process in-memory store
+AGENT_HISTORY_MAX_MESSAGES = 10
+AGENT_HISTORY_TTL_SECONDS = 3600
+REDIS_URL = os.getenv("REDIS_URL")
+
+_redis = None
+if REDIS_URL:
+    try:
+        import redis.asyncio as redis
+        _redis = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+        logger.info("Agent conversation history stored in Redis")
+    except ImportError:
+        logger.warning("REDIS_URL is set but redis is not installed (pip install redis). Using in-memory history")
 
-# In production, store this in database
 agent_conversations = {}
+_history_lock = threading.Lock()
+
+
+def _history_key(patient_id: str) -> str:
+    return f"hist:{patient_id}"
+
+
+async def get_agent_history(patient_id: str):
+    """Get conversation history for a patient (snapshot, safe to iterate)"""
+    if _redis is not None:
+        items = await _redis.lrange(_history_key(patient_id), -AGENT_HISTORY_MAX_MESSAGES, -1)
+        return messages_from_dict([json.loads(item) for item in items])
+
+    with _history_lock:
+        if patient_id not in agent_conversations:
+            agent_conversations[patient_id] = deque(maxlen=AGENT_HISTORY_MAX_MESSAGES)
+        return list(agent_conversations[patient_id])
+
+
+async def add_to_agent_history(patient_id: str, *messages: BaseMessage):
+    """Add messages to conversation history (oldest messages are evicted automatically)"""
+    if _redis is not None:
+        # Append, trim and refresh expiry in a single round trip
+        key = _history_key(patient_id)
+        pipe = _redis.pipeline()
+        pipe.rpush(key, *[json.dumps(message_to_dict(message)) for message in messages])
+        pipe.ltrim(key, -AGENT_HISTORY_MAX_MESSAGES, -1)
+        pipe.expire(key, AGENT_HISTORY_TTL_SECONDS)
+        await pipe.execute()
+        return
+
+    with _history_lock:
+        if patient_id not in agent_conversations:
+            agent_conversations[patient_id] = deque(maxlen=AGENT_HISTORY_MAX_MESSAGES)
+
+        agent_conversations[patient_id].extend(messages)
+
+
+async def clear_agent_history(patient_id: str):
+    """Clear conversation history for a patient"""
+    if _redis is not None:
+        await _redis.delete(_history_key(patient_id))
+        return
 
-def get_agent_history(patient_id: str):
-    """Get conversation history for a patient"""
-    if patient_id not in agent_conversations:
-        agent_conversations[patient_id] = []
-    return agent_conversations[patient_id]
-
-def add_to_agent_history(patient_id: str, role: str, content: str):
-    """Add message to conversation history"""
-    if patient_id not in agent_conversations:
-        agent_conversations[patient_id] = []
-
-    agent_conversations[patient_id].append({
-        "role": role,
-        "content": content
-    })
-
-    # Keep only last 10 messages
-    if len(agent_conversations[patient_id]) > 10:
-        agent_conversations[patient_id] = agent_conversations[patient_id][-10:]
+    with _history_lock:
+        if patient_id in agent_conversations:
+            agent_conversations[patient_id].clear()
@@ -1,21 +1,75 @@
 """
 Local Whisper STT Service (Offline)
-Uses OpenAI's Whisper model running locally for speech-to-text
+Uses Whisper running locally via faster-whisper (CTranslate2) for speech-to-text
 """
 
+import io
 import os
 import logging
-import tempfile
+import struct
+import threading
+import traceback
 from typing import Optional
 
+import numpy as np
+from scipy.io import wavfile
+
+try:
+    import ctranslate2
+    from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+except ImportError:  # reported when the model is first loaded
+    ctranslate2 = None
+    WhisperModel = None
+    BatchedInferencePipeline = None
+    decode_audio = None
+
+try:
+    import soxr  # optional: in-process resampling of non-16 kHz WAV
+except ImportError:
+    soxr = None
+
 logger = logging.getLogger("LocalWhisperService")
 
-# Global Whisper model instance (lazy loaded)
+# Whisper models expect 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+# Model to load, overridable via environment (tiny/base/small/medium/large)
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+
+# Force a CTranslate2 compute type (e.g. int8_float16, float32); empty = pick automatically
+STT_COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "").strip()
+
+
+def _batch_size_from_env() -> int:
+    """Parse STT_BATCH_SIZE; empty, non-integer or < 1 falls back to 1"""
+    value = os.getenv("STT_BATCH_SIZE", "").strip()
+    if not value:
+        return 1
+
+    try:
+        batch_size = int(value)
+    except ValueError:
+        logger.warning(f"Invalid STT_BATCH_SIZE={value!r}, using 1 (sequential decoding)")
+        return 1
+
+    if batch_size < 1:
+        logger.warning(f"STT_BATCH_SIZE={batch_size} must be at least 1, using 1")
+        return 1
+
+    return batch_size
+
+
+# Speech chunks of one clip decoded per forward pass (1 = sequential decoding)
+STT_BATCH_SIZE = _batch_size_from_env()
+
+# Global Whisper model instance (lazy loaded, or warmed up at startup)
 _whisper_model = None
 _model_loaded = False
+_model_lock = threading.Lock()
+_batched_pipeline = None
 
 
-def load_whisper_model(model_name: str = "base"):
+def load_whisper_model(model_name: str = WHISPER_MODEL):
     """
     Load Whisper model (lazy loading)
 
@@ -32,28 +86,368 @@ def load_whisper_model(model_name: str = "base"):
     Returns:
         Loaded Whisper model
     """
-    global _whisper_model, _model_loaded
-
     if _model_loaded and _whisper_model is not None:
         return _whisper_model
 
+    # Only one thread loads the model (startup warmup may race the first request)
+    with _model_lock:
+        if _model_loaded and _whisper_model is not None:
+            return _whisper_model
+
+        return _load_model_locked(model_name)
+
+
+def _select_device_and_compute_type():
+    """
+    Pick the inference device and weight precision
+
+    GPU: float16, falling back to int8_float16 / int8_float32 / float32 on GPUs
+    without efficient fp16. CPU: int8 (dynamic int8 quantization of the Linear layers,
+    using VNNI/AVX2 int8 GEMM kernels), falling back to float32 if this CPU has no
+    int8 support. STT_COMPUTE_TYPE overrides the precision when the device supports it.
+    """
+    device = "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    supported = ctranslate2.get_supported_compute_types(device)
+
+    if STT_COMPUTE_TYPE:
+        if STT_COMPUTE_TYPE in supported:
+            return device, STT_COMPUTE_TYPE
+        logger.warning(
+            f"STT_COMPUTE_TYPE={STT_COMPUTE_TYPE} not supported on {device} "
+            f"(supported: {', '.join(sorted(supported))}), choosing automatically"
+        )
+
+    if device == "cuda":
+        fallbacks = ("float16", "int8_float16", "int8_float32", "float32")
+        for current, fallback in zip(fallbacks, fallbacks[1:]):
+            if current in supported:
+                return "cuda", current
+            logger.warning(f"{current} not supported on this GPU, trying {fallback}")
+        return "cuda", "float32"
+
+    if "int8" in supported:
+        return "cpu", "int8"
+
+    logger.warning("int8 not supported on this CPU, running Whisper in float32")
+    return "cpu", "float32"
+
+
+def _load_model_locked(model_name: str):
+    """Build the Whisper model (caller holds _model_lock)"""
+    global _whisper_model, _model_loaded
+
+    if WhisperModel is None:
+        logger.error("faster-whisper is not installed: pip install faster-whisper")
+        _model_loaded = False
+        return None
+
     try:
-        import whisper
-        logger.info(f"Loading Whisper model: {model_name}")
-        _whisper_model = whisper.load_model(model_name)
+        device, compute_type = _select_device_and_compute_type()
+
+        logger.info(f"Loading Whisper model: {model_name} ({device}, {compute_type})")
+        _whisper_model = WhisperModel(model_name, device=device, compute_type=compute_type)
         _model_loaded = True
         logger.info(f"Whisper model '{model_name}' loaded successfully!")
         return _whisper_model
     except Exception as e:
         logger.error(f"Failed to load Whisper model: {e}")
-        logger.error("Make sure you installed whisper: pip install openai-whisper")
+        logger.error("Make sure you installed faster-whisper: pip install faster-whisper")
         _model_loaded = False
         return None
 
 
+def warmup_whisper_model(model_name: str = WHISPER_MODEL):
+    """
+    Load the Whisper model and run one dummy pass so the first real request hits a hot model
+
+    Meant to be called at app startup (e.g. on a background thread).
+    """
+    model = load_whisper_model(model_name)
+
+    if model is None:
+        return
+
+    try:
+        # One second of silence; VAD off so the encoder/decoder actually run
+        segments, _ = model.transcribe(
+            np.zeros(SAMPLE_RATE, dtype=np.float32),
+            language="en",
+            beam_size=1,
+            vad_filter=False
+        )
+        list(segments)
+        logger.info("Whisper model warmed up")
+    except Exception as e:
+        logger.warning(f"Whisper warmup failed: {e}")
+
+
+# === Silence Gate ===
+
+# A 30 ms frame louder than this RMS (about -46 dBFS) counts as possible speech
+SPEECH_RMS_THRESHOLD = 0.005
+SPEECH_FRAME_SECONDS = 0.03
+
+
+def _has_speech(audio: np.ndarray, sr: int = SAMPLE_RATE) -> bool:
+    """
+    Cheap energy gate: does any short frame rise above the silence threshold?
+
+    Lets completely silent clips skip the Whisper forward pass. Deliberately
+    permissive - Whisper's own VAD still handles noise vs. speech.
+    """
+    frame = int(sr * SPEECH_FRAME_SECONDS)
+    frames = len(audio) // frame
+
+    if frames == 0:
+        return len(audio) > 0 and float(np.sqrt(np.mean(audio * audio))) > SPEECH_RMS_THRESHOLD
+
+    framed = audio[:frames * frame].reshape(frames, frame)
+    # Per-frame energy without materializing audio**2
+    energy = np.einsum("ij,ij->i", framed, framed)
+    peak_rms = float(np.sqrt(energy.max() / frame))
+
+    return peak_rms > SPEECH_RMS_THRESHOLD
+
+
+# === Audio Buffer Pool ===
+
+# Pooled buffers hold Whisper's 30 s window plus headroom for audio fed between passes
+POOL_BUFFER_SECONDS = 32
+
+
+class _AudioBufferPool:
+    """
+    Recycles preallocated float32 audio buffers
+
+    Saves allocating (and the allocator/GC churn of freeing) a fresh multi-second
+    array for every upload or streaming session.
+    """
+
+    def __init__(self, buffer_samples: int, max_free: int = 4):
+        self.buffer_samples = buffer_samples
+        self.max_free = max_free
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> np.ndarray:
+        """Get a buffer (contents are undefined)"""
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+
+        return np.empty(self.buffer_samples, dtype=np.float32)
+
+    def release(self, buffer: np.ndarray):
+        """Return a buffer to the pool (extra buffers are just dropped)"""
+        if buffer.shape != (self.buffer_samples,):
+            return
+
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(buffer)
+
+
+audio_buffer_pool = _AudioBufferPool(POOL_BUFFER_SECONDS * SAMPLE_RATE)
+
+
+def _pcm_to_float32(data: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert (possibly multi-channel) PCM samples to float32 mono in [-1, 1]
+
+    Args:
+        data: PCM samples, shape (n,) or (n, channels)
+        out: Buffer to write into if it is long enough (result is a view of it)
+
+    Returns:
+        float32 waveform
+    """
+    n = data.shape[0]
+    audio = out[:n] if out is not None and len(out) >= n else np.empty(n, dtype=np.float32)
+
+    # Downmix multi-channel recordings
+    if data.ndim > 1:
+        np.mean(data, axis=1, dtype=np.float32, out=audio)
+    else:
+        np.copyto(audio, data, casting="unsafe")
+
+    # Scale integer PCM to [-1, 1]
+    if data.dtype == np.uint8:
+        audio -= 128.0
+        audio /= 128.0
+    elif np.issubdtype(data.dtype, np.integer):
+        audio *= 1.0 / float(-np.iinfo(data.dtype).min)
+
+    return audio
+
+
+# (format tag, bits per sample) -> sample dtype; 0xFFFE (extensible) resolves to its subformat
+_WAV_SAMPLE_DTYPES = {
+    (1, 8): np.dtype(np.uint8),
+    (1, 16): np.dtype("<i2"),
+    (1, 32): np.dtype("<i4"),
+    (3, 32): np.dtype("<f4"),
+    (3, 64): np.dtype("<f8"),
+}
+
+
+def _parse_wav(buffer) -> Optional[tuple]:
+    """
+    Locate the samples of a plain PCM / float WAV without copying them
+
+    Args:
+        buffer: WAV file contents (bytes, memoryview, mmap, ...)
+
+    Returns:
+        (sample_rate, samples) where samples is a numpy view into buffer, shape (n,)
+        or (n, channels), or None for layouts this doesn't handle (e.g. 24-bit)
+    """
+    view = memoryview(buffer)
+    if len(view) < 12 or view[0:4] != b"RIFF" or view[8:12] != b"WAVE":
+        return None
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(view):
+        chunk_id = view[pos:pos + 4]
+        (size,) = struct.unpack_from("<I", view, pos + 4)
+        body = pos + 8
+
+        if chunk_id == b"fmt " and size >= 16:
+            tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", view, body)
+            if tag == 0xFFFE and size >= 26:
+                (tag,) = struct.unpack_from("<H", view, body + 24)
+            fmt = (tag, channels, sample_rate, bits)
+
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+
+            tag, channels, sample_rate, bits = fmt
+            dtype = _WAV_SAMPLE_DTYPES.get((tag, bits))
+            if dtype is None or channels < 1:
+                return None
+
+            # Tolerate truncated files / placeholder sizes from streaming writers
+            size = min(size, len(view) - body)
+            frames = size // (dtype.itemsize * channels)
+            samples = np.frombuffer(view, dtype=dtype, count=frames * channels, offset=body)
+
+            return sample_rate, samples.reshape(frames, channels) if channels > 1 else samples
+
+        # Chunks are word-aligned
+        pos = body + size + (size & 1)
+
+    return None
+
+
+def _load_wav_from_bytes(
+    audio_bytes,
+    sr: int = SAMPLE_RATE,
+    out: Optional[np.ndarray] = None
+) -> Optional[np.ndarray]:
+    """
+    Parse PCM WAV bytes straight into a float32 mono waveform (no decoder involved)
+
+    Samples are read in place from the given buffer (bytes, memoryview or mmap),
+    falling back to scipy for WAV layouts _parse_wav doesn't handle.
+
+    Args:
+        audio_bytes: WAV file contents (any bytes-like object)
+        sr: Required sample rate
+        out: Buffer to decode into if it is long enough (e.g. from audio_buffer_pool)
+
+    Returns:
+        Waveform as float32 numpy array in [-1, 1], or None if the bytes aren't a
+        WAV we can handle here (caller falls back to the full decoder)
+    """
+    if audio_bytes[:4] != b"RIFF":
+        return None
+
+    try:
+        parsed = _parse_wav(audio_bytes)
+        file_sr, data = parsed if parsed is not None else wavfile.read(io.BytesIO(audio_bytes))
+    except Exception as e:
+        logger.warning(f"Could not parse WAV header, using decoder instead: {e}")
+        return None
+
+    # Other rates need soxr to resample in-process
+    if file_sr != sr and soxr is None:
+        return None
+
+    if file_sr != sr:
+        return soxr.resample(_pcm_to_float32(data), file_sr, sr)
+
+    return _pcm_to_float32(data, out=out)
+
+
+def _load_audio_from_bytes(
+    audio_bytes: bytes,
+    sr: int = SAMPLE_RATE,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Decode audio bytes to a float32 mono waveform in memory
+
+    WAV is parsed directly (resampled with soxr if installed); anything else goes through faster-whisper's
+    in-process decoder (PyAV), so no temp file or ffmpeg subprocess either way.
+
+    Args:
+        audio_bytes: Encoded audio (wav, mp3, m4a, etc.)
+        sr: Target sample rate
+        out: Buffer that WAV samples may be decoded into (see _load_wav_from_bytes)
+
+    Returns:
+        Waveform as float32 numpy array in [-1, 1]
+    """
+    audio = _load_wav_from_bytes(audio_bytes, sr, out=out)
+
+    if audio is not None:
+        return audio
+
+    return decode_audio(io.BytesIO(audio_bytes), sampling_rate=sr)
+
+
+def _batched_pipeline_for(model):
+    """Batched wrapper around a loaded model (cached, rebuilt if the model changes)"""
+    global _batched_pipeline
+
+    pipeline = _batched_pipeline
+    if pipeline is None or pipeline.model is not model:
+        pipeline = BatchedInferencePipeline(model)
+        _batched_pipeline = pipeline
+
+    return pipeline
+
+
+def _transcribe_segments(model, audio, language: Optional[str]):
+    """
+    Run Whisper on a file path or waveform and return the segments generator
+
+    With STT_BATCH_SIZE > 1 the clip is split at VAD speech boundaries and its
+    chunks are decoded together in batches; otherwise decoding is sequential.
+    VAD skips silent stretches either way.
+    """
+    if STT_BATCH_SIZE > 1 and BatchedInferencePipeline is not None:
+        segments, _ = _batched_pipeline_for(model).transcribe(
+            audio,
+            language=language,
+            beam_size=1,
+            batch_size=STT_BATCH_SIZE
+        )
+        return segments
+
+    segments, _ = model.transcribe(
+        audio,
+        language=language,
+        beam_size=1,
+        vad_filter=True
+    )
+    return segments
+
+
 def transcribe_audio_local(
     audio_file_path: str,
-    model_name: str = "base",
+    model_name: str = WHISPER_MODEL,
     language: str = "en"
 ) -> Optional[str]:
     """
@@ -76,14 +470,10 @@ def transcribe_audio_local(
     try:
         logger.info(f"Transcribing audio file: {audio_file_path}")
 
-        # Transcribe with Whisper
-        result = model.transcribe(
-            audio_file_path,
-            language=language,
-            fp16=False  # Use FP32 for CPU (FP16 for GPU)
-        )
+        # Transcribe with Whisper (VAD skips silent stretches)
+        segments = _transcribe_segments(model, audio_file_path, language)
 
-        text = result["text"].strip()
+        text = "".join(segment.text for segment in segments).strip()
         logger.info(f"Transcription successful: {text[:50]}...")
         return text
 
@@ -96,77 +486,92 @@ def transcribe_audio_local(
 
 
 def transcribe_audio_from_bytes(
-    audio_bytes: bytes,
-    model_name: str = "base",
-    language: str = "en"
+    audio_bytes,
+    model_name: str = WHISPER_MODEL,
+    language: str = "en",
+    model=None
 ) -> Optional[str]:
     """
     Transcribe audio directly from bytes (no temp file needed!)
 
     Args:
-        audio_bytes: Audio file bytes (WAV format)
+        audio_bytes: Audio file bytes (any bytes-like object; WAV is decoded in place)
         model_name: Whisper model to use
         language: Language code
+        model: Already-loaded Whisper model (optional, skips the cache lookup)
 
     Returns:
         Transcribed text or None if error
     """
-    model = load_whisper_model(model_name)
+    if model is None:
+        model = load_whisper_model(model_name)
 
     if model is None:
         logger.error("Whisper model not available")
         return None
 
-    import whisper
-    import time
-    import uuid
-
-    # Whisper's load_audio() needs a file path, not BytesIO
-    # So we save to a persistent temp file, load into memory, then delete
-    temp_path = None
+    # WAV samples are decoded into a pooled buffer instead of a fresh array
+    buffer = audio_buffer_pool.acquire()
     try:
-        # Create dedicated temp directory
-        temp_dir = os.path.join(os.getcwd(), "temp_whisper")
-        os.makedirs(temp_dir, exist_ok=True)
+        try:
+            logger.info(f"Decoding audio in memory ({len(audio_bytes)} bytes)...")
 
-        temp_filename = f"whisper_{uuid.uuid4().hex[:8]}.wav"
-        temp_path = os.path.join(temp_dir, temp_filename)
+            # Decode bytes in memory (no temp file)
+            audio_array = _load_audio_from_bytes(audio_bytes, out=buffer)
 
-        logger.info(f"Saving audio to {temp_path} ({len(audio_bytes)} bytes)")
+            logger.info(f"Audio loaded, starting transcription...")
 
-        # Write bytes to file
-        with open(temp_path, 'wb') as f:
-            f.write(audio_bytes)
-            f.flush()
-            os.fsync(f.fileno())
+        except Exception as e:
+            logger.error(f"Error decoding audio bytes: {e}")
+            logger.error(traceback.format_exc())
+            return None
 
-        time.sleep(0.1)  # Let Windows release file handle
+        return transcribe_audio_array(audio_array, language=language, model=model)
+    finally:
+        audio_buffer_pool.release(buffer)
 
-        if not os.path.exists(temp_path):
-            logger.error(f"Temp file disappeared: {temp_path}")
-            return None
 
-        logger.info(f"Loading audio into memory using Whisper...")
+def transcribe_audio_array(
+    audio_array: np.ndarray,
+    model_name: str = WHISPER_MODEL,
+    language: str = "en",
+    model=None
+) -> Optional[str]:
+    """
+    Transcribe an in-memory waveform
 
-        # Load audio into numpy array (Whisper does this internally via ffmpeg)
-        audio_array = whisper.load_audio(temp_path)
+    Args:
+        audio_array: float32 mono waveform at 16 kHz, in [-1, 1]
+        model_name: Whisper model to use
+        language: Language code
+        model: Already-loaded Whisper model (optional, skips the cache lookup)
 
-        logger.info(f"Audio loaded, starting transcription...")
+    Returns:
+        Transcribed text or None if error / no speech
+    """
+    if model is None:
+        model = load_whisper_model(model_name)
 
-        # Transcribe from the in-memory audio array
-        result = model.transcribe(
-            audio_array,
-            language=language,
-            fp16=False
-        )
+    if model is None:
+        logger.error("Whisper model not available")
+        return None
 
-        text = result["text"].strip()
+    if not _has_speech(audio_array):
+        logger.warning(f"⚠️ Audio is silent ({len(audio_array) / SAMPLE_RATE:.2f} seconds), skipping transcription")
+        logger.warning(f"Possible causes: emulator microphone not working, too quiet")
+        return None
+
+    try:
+        # Transcribe from the in-memory audio array (VAD skips silent stretches)
+        segments = _transcribe_segments(model, audio_array, language)
+
+        text = "".join(segment.text for segment in segments).strip()
 
         # Check if transcription is empty
         if not text or len(text) == 0:
             logger.warning(f"⚠️ Transcription returned EMPTY text!")
             logger.warning(f"Audio array shape: {audio_array.shape}")
-            logger.warning(f"Audio duration: {len(audio_array) / 16000:.2f} seconds")
+            logger.warning(f"Audio duration: {len(audio_array) / SAMPLE_RATE:.2f} seconds")
             logger.warning(f"This usually means: silence, very short audio, or no speech detected")
             logger.warning(f"Possible causes: emulator microphone not working, too quiet, background noise")
             return None  # Return None for empty transcriptions
@@ -175,57 +580,15 @@ def transcribe_audio_from_bytes(
         return text
 
     except Exception as e:
-        logger.error(f"Error transcribing from bytes: {e}")
-        import traceback
+        logger.error(f"Error transcribing audio: {e}")
         logger.error(traceback.format_exc())
         return None
 
-    finally:
-        # Clean up temp file
-        if temp_path and os.path.exists(temp_path):
-            try:
-                time.sleep(0.1)
-                os.unlink(temp_path)
-                logger.info(f"Cleaned up: {temp_path}")
-            except Exception as cleanup_error:
-                logger.warning(f"Cleanup failed: {cleanup_error}")
-
-
-def _transcribe_with_temp_file(
-    audio_bytes: bytes,
-    model_name: str = "base",
-    language: str = "en"
-) -> Optional[str]:
-    """Fallback method using temp file"""
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav", mode='wb') as temp_file:
-            temp_file.write(audio_bytes)
-            temp_file.flush()
-            temp_path = temp_file.name
-
-        # Keep file open longer
-        import time
-        time.sleep(0.5)
-
-        text = transcribe_audio_local(temp_path, model_name=model_name, language=language)
-
-        # Clean up
-        try:
-            os.unlink(temp_path)
-        except:
-            pass
-
-        return text
-
-    except Exception as e:
-        logger.error(f"Error in fallback transcription: {e}")
-        return None
-
 
 async def transcribe_audio_bytes_local(
     audio_bytes: bytes,
     filename: str = "temp_audio.wav",
-    model_name: str = "base"
+    model_name: str = WHISPER_MODEL
 ) -> Optional[str]:
     """
     Transcribe audio from bytes using local Whisper (async wrapper)
@@ -240,7 +603,3 @@ async def transcribe_audio_bytes_local(
     """
     # Use the new direct bytes method
     return transcribe_audio_from_bytes(audio_bytes, model_name=model_name)
-
-
-# Preload model on module import (optional - comment out to lazy load)
-# load_whisper_model("base")
@@ -0,0 +1,44 @@
+"""
+Reminder Date/Time Parsing
+Shared parser for the 'dd MMM yyyy' + 'hh:mm AM/PM' strings reminders are stored with
+"""
+
+import re
+from datetime import datetime
+
+# Precompiled equivalent of strptime(..., "%d %b %Y %I:%M %p"), which re-parses
+# its format string on every call. Field patterns mirror strptime's own (including
+# the optional leading space on day/hour), but digits are ASCII-only: strptime also
+# takes e.g. Arabic-Indic digits in the year/minute, which we don't want stored.
+_REMINDER_DATETIME_RE = re.compile(
+    r"(3[01]|[12][0-9]|0[1-9]|[1-9]| [1-9])\s+([A-Za-z]{3})\s+([0-9]{4})"
+    r"\s+(1[0-2]|0[1-9]|[1-9]| [1-9]):([0-5][0-9]|[0-9])\s+([AaPp][Mm])"
+)
+_MONTHS = {
+    name: number
+    for number, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"],
+        start=1
+    )
+}
+
+
+def parse_reminder_datetime(date: str, time: str) -> datetime:
+    """
+    Parse reminder date ('dd MMM yyyy') and time ('hh:mm AM/PM') to a datetime
+
+    Raises:
+        ValueError: If the date/time is malformed or not a real calendar date
+    """
+    match = _REMINDER_DATETIME_RE.fullmatch(f"{date} {time}")
+    month = _MONTHS.get(match.group(2).lower()) if match else None
+
+    if month is None:
+        raise ValueError(f"'{date} {time}' does not match format 'dd MMM yyyy hh:mm AM/PM'")
+
+    # 12 AM is midnight, 12 PM is noon
+    hour = int(match.group(4)) % 12
+    if match.group(6).lower() == "pm":
+        hour += 12
+
+    return datetime(int(match.group(3)), month, int(match.group(1)), hour, int(match.group(5)))
@@ -5,10 +5,17 @@ Automatically falls back to local Whisper if OpenAI key is not available
 """
 
 import os
+import asyncio
 import logging
+import mimetypes
+import mmap
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+import numpy as np
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 load_dotenv()
 
@@ -18,14 +25,56 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 USE_LOCAL_WHISPER = not OPENAI_API_KEY  # Auto-switch to local if no API key
 
 if OPENAI_API_KEY:
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    client = AsyncOpenAI(api_key=OPENAI_API_KEY)
     logger.info("Using OpenAI Whisper API for STT")
 else:
     client = None
     logger.info("OpenAI API key not found. Using LOCAL Whisper for STT (offline)")
 
+# Bounded pool for blocking transcription work: requests queue here instead of
+# stalling the event loop or spawning a thread each
+_stt_executor = ThreadPoolExecutor(
+    max_workers=min(4, os.cpu_count() or 1),
+    thread_name_prefix="stt"
+)
 
-def transcribe_audio(
+
+def _get_local_model():
+    """
+    Get the shared local Whisper model (loaded once, then reused for every request)
+
+    Delegates to local_whisper_service so the startup warmup and requests share one instance.
+    """
+    from app.services.local_whisper_service import load_whisper_model
+
+    return load_whisper_model()
+
+
+def preload_stt_model():
+    """
+    Warm up the local Whisper model on a background thread (no-op when using OpenAI)
+
+    Call at app startup so the first voice request doesn't pay the model load.
+    """
+    if not USE_LOCAL_WHISPER:
+        return
+
+    threading.Thread(target=_warmup_local_model, name="whisper-warmup", daemon=True).start()
+    logger.info("Local Whisper model warmup started in background")
+
+
+def _warmup_local_model():
+    """Import and warm up local Whisper (runs on the warmup thread, never fails startup)"""
+    try:
+        from app.services.local_whisper_service import warmup_whisper_model
+    except ImportError as e:
+        logger.warning(f"Local Whisper unavailable, skipping warmup: {e}")
+        return
+
+    warmup_whisper_model()
+
+
+async def transcribe_audio(
     audio_file_path: str,
     model: str = "whisper-1",
     response_format: str = "text"
@@ -42,123 +91,385 @@ def transcribe_audio(
     Returns:
         Transcribed text or None if error
     """
-    # Use local Whisper if OpenAI client not available
+    # Local Whisper maps the file on the STT thread pool, so the mapping lives
+    # exactly as long as the thread decoding from it
     if USE_LOCAL_WHISPER:
-        try:
-            from app.services.local_whisper_service import transcribe_audio_from_bytes
-            logger.info(f"Using LOCAL Whisper to transcribe: {audio_file_path}")
-
-            # Load audio file into memory to avoid file locking issues
-            try:
-                with open(audio_file_path, 'rb') as f:
-                    audio_bytes = f.read()
-                logger.info(f"Loaded audio into memory ({len(audio_bytes)} bytes), transcribing...")
-                return transcribe_audio_from_bytes(audio_bytes, model_name="base")
-            except FileNotFoundError:
-                logger.error(f"Audio file not found: {audio_file_path}")
-                return None
-
-        except Exception as e:
-            logger.error(f"Error with local Whisper: {e}")
-            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_stt_executor, _transcribe_file_sync, audio_file_path)
 
-    # Use OpenAI Whisper API
+    # OpenAI needs a full copy for the upload anyway: read it once, off the event loop
     try:
-        with open(audio_file_path, "rb") as audio_file:
-            logger.info(f"Transcribing audio file with OpenAI: {audio_file_path}")
-
-            transcription = client.audio.transcriptions.create(
-                model=model,
-                file=audio_file,
-                response_format=response_format
-            )
-
-            # Extract text from response
-            if hasattr(transcription, 'text'):
-                text = transcription.text
-            else:
-                text = str(transcription)
-
-            logger.info(f"Transcription successful: {text[:50]}...")
-            return text
-
+        audio_bytes = await asyncio.to_thread(_read_audio_file, audio_file_path)
     except FileNotFoundError:
         logger.error(f"Audio file not found: {audio_file_path}")
         return None
-    except Exception as e:
-        logger.error(f"Error during transcription: {e}")
+    except OSError as e:
+        logger.error(f"Error reading audio file {audio_file_path}: {e}")
         return None
 
+    logger.info(f"Loaded audio into memory ({len(audio_bytes)} bytes): {audio_file_path}")
+
+    return await transcribe_audio_bytes(
+        audio_bytes,
+        filename=os.path.basename(audio_file_path),
+        model=model,
+        response_format=response_format
+    )
+
+
+def _read_audio_file(audio_file_path: str) -> bytes:
+    """Read a whole audio file into memory"""
+    with open(audio_file_path, "rb") as f:
+        return f.read()
+
 
 async def transcribe_audio_bytes(
     audio_bytes: bytes,
     filename: str = "temp_audio.wav",
-    model: str = "whisper-1"
+    model: str = "whisper-1",
+    response_format: str = "text"
 ) -> Optional[str]:
     """
     Transcribe audio from bytes (useful for uploaded files)
     Automatically uses local Whisper if OpenAI API key not available
 
+    Nothing is written to disk: local Whisper decodes the bytes in memory on the
+    STT thread pool, and the OpenAI path uploads them directly.
+
     Args:
-        audio_bytes: Audio file bytes
-        filename: Temporary filename to use
+        audio_bytes: Audio file bytes (any bytes-like object, e.g. memoryview)
+        filename: Filename sent with the upload (its extension tells OpenAI the format)
         model: Whisper model to use (whisper-1 for OpenAI, base for local)
+        response_format: Response format for OpenAI (text, json, verbose_json)
 
     Returns:
         Transcribed text or None if error
     """
-    import tempfile
-    import time
-    import uuid
-
-    # Create temp directory if it doesn't exist
-    temp_dir = os.path.join(os.getcwd(), "temp_audio")
-    os.makedirs(temp_dir, exist_ok=True)
+    if not audio_bytes:
+        logger.error("Audio bytes are empty")
+        return None
 
-    # Use a unique filename in our own temp directory (not system temp)
-    temp_filename = f"voice_{uuid.uuid4().hex[:8]}.wav"
-    temp_path = os.path.join(temp_dir, temp_filename)
+    if USE_LOCAL_WHISPER:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_stt_executor, _transcribe_sync, audio_bytes)
 
-    text = None
     try:
-        # Write audio bytes to file
-        with open(temp_path, "wb") as temp_file:
-            temp_file.write(audio_bytes)
-            temp_file.flush()
-            os.fsync(temp_file.fileno())
-
-        # Small delay to ensure file is fully closed (Windows issue)
-        time.sleep(0.2)
-
-        # Verify file exists and has data
-        if not os.path.exists(temp_path):
-            logger.error(f"Temp file disappeared: {temp_path}")
-            return None
+        logger.info(f"Transcribing audio with OpenAI ({len(audio_bytes)} bytes)")
 
-        file_size = os.path.getsize(temp_path)
-        if file_size == 0:
-            logger.error(f"Temp file is empty: {temp_path}")
-            return None
+        content_type = mimetypes.guess_type(filename)[0] or "audio/wav"
+        # The upload needs real bytes (a copy is unavoidable here anyway)
+        if not isinstance(audio_bytes, bytes):
+            audio_bytes = bytes(audio_bytes)
+
+        transcription = await client.audio.transcriptions.create(
+            model=model,
+            file=(filename, audio_bytes, content_type),
+            response_format=response_format
+        )
 
-        logger.info(f"Temp file ready for transcription: {temp_path} (size: {file_size} bytes)")
+        # Extract text from response
+        if hasattr(transcription, 'text'):
+            text = transcription.text
+        else:
+            text = str(transcription)
 
-        # Transcribe (will auto-use local Whisper if no OpenAI key)
-        text = transcribe_audio(temp_path, model=model)
+        logger.info(f"Transcription successful: {text[:50]}...")
+        return text
+
+    except Exception as e:
+        logger.error(f"Error during transcription: {e}")
+        return None
 
+
+def _transcribe_sync(audio_bytes) -> Optional[str]:
+    """Blocking local Whisper transcription (in-memory decode + inference), run on _stt_executor"""
+    try:
+        from app.services.local_whisper_service import transcribe_audio_from_bytes
+
+        local_model = _get_local_model()
+        if local_model is None:
+            logger.error("Local Whisper model not available")
+            return None
+
+        text = transcribe_audio_from_bytes(audio_bytes, model=local_model)
         logger.info(f"Transcription complete, result: {text[:50] if text else 'None'}...")
+        return text
 
     except Exception as e:
         logger.error(f"Error transcribing audio bytes: {e}")
-        import traceback
         logger.error(traceback.format_exc())
-    finally:
-        # Clean up temp file AFTER transcription is complete
-        if temp_path and os.path.exists(temp_path):
-            try:
-                time.sleep(0.1)  # Small delay before cleanup
-                os.unlink(temp_path)
-                logger.info(f"Cleaned up temp file: {temp_path}")
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup temp file {temp_path}: {cleanup_error}")
-
-    return text
+        return None
+
+
+def _transcribe_file_sync(audio_file_path: str) -> Optional[str]:
+    """
+    Blocking local Whisper transcription of a file, run on _stt_executor
+
+    The file is memory-mapped rather than read into a copy: WAV samples are decoded
+    straight from the mapped pages, which the kernel loads on demand.
+    """
+    try:
+        with open(audio_file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                logger.error(f"Audio file is empty: {audio_file_path}")
+                return None
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as audio_map:
+                logger.info(f"Mapped audio file ({len(audio_map)} bytes): {audio_file_path}")
+                return _transcribe_sync(audio_map)
+
+    except FileNotFoundError:
+        logger.error(f"Audio file not found: {audio_file_path}")
+        return None
+    except OSError as e:
+        logger.error(f"Error reading audio file {audio_file_path}: {e}")
+        return None
+
+
+# === Streaming Transcription (local Whisper) ===
+
+class StreamingTranscriber:
+    """
+    Incremental local transcription of live microphone audio (LocalAgreement-2)
+
+    Audio is transcribed while it is still being recorded: every `min_chunk_size`
+    seconds of new audio the whole rolling buffer is re-transcribed, and a word is
+    confirmed once two consecutive passes agree on it. Once a sentence is confirmed
+    its audio is trimmed from the buffer and its text is carried as the prompt.
+
+    Input at other sample rates is resampled on the fly with a soxr ResampleStream.
+
+    Usage:
+        transcriber = StreamingTranscriber()
+        for chunk in chunks:            # float32 or int16 PCM, mono
+            print(transcriber.feed_chunk(chunk), end="")
+        print(transcriber.flush())
+    """
+
+    def __init__(
+        self,
+        model=None,
+        language: str = "en",
+        min_chunk_size: float = 1.0,
+        max_buffer_seconds: float = 30.0,
+        input_sample_rate: Optional[int] = None
+    ):
+        """
+        Args:
+            model: Loaded faster-whisper model (defaults to the shared local model)
+            language: Language code
+            min_chunk_size: Seconds of new audio between transcription passes
+            max_buffer_seconds: Buffer length that forces a trim even mid-sentence
+            input_sample_rate: Sample rate of the fed chunks (resampled to 16 kHz if
+                different; defaults to 16 kHz)
+        """
+        from app.services.local_whisper_service import SAMPLE_RATE, audio_buffer_pool, soxr
+
+        self.model = model if model is not None else _get_local_model()
+        self.language = language
+        self.min_chunk_size = min_chunk_size
+        self.max_buffer_seconds = max_buffer_seconds
+        self.sample_rate = SAMPLE_RATE
+        self.input_sample_rate = input_sample_rate or SAMPLE_RATE
+
+        if self.model is None:
+            raise RuntimeError("Local Whisper model not available")
+
+        if self.input_sample_rate != self.sample_rate and soxr is None:
+            raise RuntimeError(
+                f"Resampling {self.input_sample_rate} Hz input needs soxr: pip install soxr"
+            )
+        self._soxr = soxr
+
+        # Rolling buffer lives in a pooled preallocated array: audio_buffer is a view of it
+        self._pool = audio_buffer_pool
+        self._store = self._pool.acquire()
+
+        self.reset()
+
+    def reset(self):
+        """Drop all buffered audio and text"""
+        self._length = 0
+        self.buffer_offset = 0.0  # Stream time (s) of audio_buffer[0]
+        self.confirmed = []  # (start, end, word) in stream time
+        self.hypothesis = []  # Unconfirmed words from the previous pass
+        self._new_samples = 0
+        self._resampler = None
+
+        if self.input_sample_rate != self.sample_rate:
+            # Keeps filter state across chunks, so chunk edges don't click
+            self._resampler = self._soxr.ResampleStream(
+                self.input_sample_rate, self.sample_rate, 1, dtype="float32"
+            )
+
+    def close(self):
+        """Return the buffer to the pool (the transcriber can't be used afterwards)"""
+        if self._store is not None:
+            self._pool.release(self._store)
+            self._store = None
+
+    @property
+    def audio_buffer(self) -> np.ndarray:
+        """Buffered 16 kHz audio not yet trimmed"""
+        return self._store[:self._length]
+
+    @property
+    def text(self) -> str:
+        """All confirmed text so far"""
+        return "".join(word for _, _, word in self.confirmed).strip()
+
+    def feed_chunk(self, pcm: np.ndarray) -> str:
+        """
+        Append a chunk of audio and transcribe if enough new audio has arrived
+
+        Args:
+            pcm: Mono PCM samples at input_sample_rate (float32 in [-1, 1] or int16)
+
+        Returns:
+            Newly confirmed text (empty string if nothing new was confirmed)
+        """
+        pcm = self._to_float32(pcm)
+
+        if self._resampler is not None:
+            pcm = self._resampler.resample_chunk(pcm)
+
+        self._append(pcm)
+
+        if self._new_samples < self.min_chunk_size * self.sample_rate:
+            return ""
+
+        self._new_samples = 0
+        return self._process_buffer()
+
+    @staticmethod
+    def _to_float32(pcm: np.ndarray) -> np.ndarray:
+        """Flatten a PCM chunk to float32 in [-1, 1]"""
+        pcm = np.asarray(pcm).reshape(-1)
+        if pcm.dtype == np.int16:
+            return pcm.astype(np.float32) / 32768.0
+        return pcm.astype(np.float32, copy=False)
+
+    def _append(self, pcm: np.ndarray):
+        """Append 16 kHz float32 samples to the rolling buffer"""
+        self._new_samples += len(pcm)
+        capacity = len(self._store)
+
+        # Should only happen if passes can't keep up: drop the oldest audio
+        if len(pcm) > capacity:
+            self._drop(self._length)
+            self.buffer_offset += (len(pcm) - capacity) / self.sample_rate
+            pcm = pcm[-capacity:]
+        elif self._length + len(pcm) > capacity:
+            self._drop(self._length + len(pcm) - capacity)
+
+        self._store[self._length:self._length + len(pcm)] = pcm
+        self._length += len(pcm)
+
+    def _drop(self, samples: int):
+        """Discard the oldest samples from the rolling buffer"""
+        samples = max(0, min(samples, self._length))
+        remaining = self._length - samples
+        self._store[:remaining] = self._store[samples:self._length]
+        self._length = remaining
+        self.buffer_offset += samples / self.sample_rate
+
+    def flush(self) -> str:
+        """
+        End of stream: confirm whatever the last pass produced
+
+        Returns:
+            Remaining unconfirmed text
+        """
+        if self._resampler is not None:
+            # Drain the samples the resampler is still holding back
+            self._append(self._resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+            self._resampler.clear()
+
+        text = self._process_buffer() if self._new_samples else ""
+
+        remaining = self.hypothesis
+        self.confirmed.extend(remaining)
+        self.hypothesis = []
+        self._new_samples = 0
+
+        return text + "".join(word for _, _, word in remaining)
+
+    def _prompt(self) -> Optional[str]:
+        """Confirmed text whose audio has already been trimmed from the buffer"""
+        words = [word for _, end, word in self.confirmed if end <= self.buffer_offset]
+        # Whisper only uses the tail of a long prompt
+        prompt = "".join(words).strip()[-200:]
+        return prompt or None
+
+    def _transcribe_buffer(self) -> list:
+        """Transcribe the rolling buffer into (start, end, word) in stream time"""
+        segments, _ = self.model.transcribe(
+            self.audio_buffer,
+            language=self.language,
+            beam_size=1,
+            word_timestamps=True,
+            condition_on_previous_text=False,
+            initial_prompt=self._prompt()
+        )
+
+        return [
+            (word.start + self.buffer_offset, word.end + self.buffer_offset, word.word)
+            for segment in segments
+            for word in (segment.words or [])
+        ]
+
+    def _process_buffer(self) -> str:
+        """One update pass: transcribe, confirm the agreed prefix, trim the buffer"""
+        try:
+            words = self._transcribe_buffer()
+        except Exception as e:
+            logger.error(f"Error during streaming transcription: {e}")
+            return ""
+
+        # Ignore words that were already confirmed in an earlier pass
+        last_end = self.confirmed[-1][1] if self.confirmed else self.buffer_offset
+        words = [w for w in words if w[0] > last_end - 0.1]
+
+        # LocalAgreement-2: confirm the longest prefix shared with the previous pass
+        agreed = 0
+        for current, previous in zip(words, self.hypothesis):
+            if _normalize_word(current[2]) != _normalize_word(previous[2]):
+                break
+            agreed += 1
+
+        newly_confirmed = words[:agreed]
+        self.confirmed.extend(newly_confirmed)
+        self.hypothesis = words[agreed:]
+
+        self._trim_buffer(newly_confirmed)
+
+        return "".join(word for _, _, word in newly_confirmed)
+
+    def _trim_buffer(self, newly_confirmed: list):
+        """Cut confirmed audio from the buffer at a sentence end (or when it grows too long)"""
+        cut = None
+
+        for _, end, word in reversed(newly_confirmed):
+            if word.rstrip().endswith((".", "?", "!")):
+                cut = end
+                break
+
+        buffer_seconds = self._length / self.sample_rate
+        if cut is None and buffer_seconds > self.max_buffer_seconds:
+            # No sentence boundary in sight: cut at the last confirmed word, or drop
+            # the oldest audio if nothing is confirmed
+            if self.confirmed and self.confirmed[-1][1] > self.buffer_offset:
+                cut = self.confirmed[-1][1]
+            else:
+                cut = self.buffer_offset + buffer_seconds - self.max_buffer_seconds
+
+        if cut is None:
+            return
+
+        self._drop(int((cut - self.buffer_offset) * self.sample_rate))
+        self.buffer_offset = cut
+
+
+def _normalize_word(word: str) -> str:
+    """Compare words ignoring case, spacing and punctuation"""
+    return "".join(ch for ch in word.lower() if ch.isalnum())
@@ -5,7 +5,8 @@ Handles connection to Supabase for database and storage operations
 
 import os
 import logging
-from supabase import create_client, Client
+import httpx
+from supabase import create_client, Client, ClientOptions
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -21,6 +22,25 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")  # For admin operations
 # Initialize Supabase client
 supabase_client: Client = None
 
+# Shared HTTP/2 keep-alive connection pool, reused by every Supabase request
+# so tool calls don't pay a fresh TCP + TLS handshake each time
+_http_client: httpx.Client = None
+
+
+def _get_http_client() -> httpx.Client:
+    """Get the shared HTTP/2 client used under the Supabase client"""
+    global _http_client
+
+    if _http_client is None:
+        _http_client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+            timeout=httpx.Timeout(30.0),
+            follow_redirects=True
+        )
+
+    return _http_client
+
 def get_supabase_client(use_service_key: bool = False) -> Client:
     """
     Get Supabase client instance
@@ -46,7 +66,11 @@ def get_supabase_client(use_service_key: bool = False) -> Client:
 
     if supabase_client is None:
         try:
-            supabase_client = create_client(SUPABASE_URL, key)
+            supabase_client = create_client(
+                SUPABASE_URL,
+                key,
+                options=ClientOptions(httpx_client=_get_http_client())
+            )
             logger.info(f"Supabase client initialized with {'service' if use_service_key else 'anon'} key")
         except Exception as e:
             logger.error(f"Failed to initialize Supabase client: {e}")
@@ -4,6 +4,9 @@
 -- Enable pgvector extension for face embeddings (if not already enabled)
 CREATE EXTENSION IF NOT EXISTS vector;
 
+-- Enable pg_trgm for indexed case-insensitive title search on reminders
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- ===== PAIRS TABLE =====
 -- Stores patient-caretaker relationships
 CREATE TABLE IF NOT EXISTS pairs (
@@ -32,6 +35,74 @@ CREATE TABLE IF NOT EXISTS reminders (
 CREATE INDEX IF NOT EXISTS idx_reminders_pair ON reminders(pair_id);
 CREATE INDEX IF NOT EXISTS idx_reminders_date ON reminders(date);
 
+-- Parsed timestamp of date + time so upcoming reminders can be filtered/sorted in SQL.
+-- to_timestamp() is not IMMUTABLE, so this is kept in sync by a trigger instead of
+-- a GENERATED column.
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS scheduled_at TIMESTAMP WITH TIME ZONE;
+
+-- Parse a reminder's date + time, NULL for malformed rows instead of raising, so a
+-- bad legacy row can't abort the backfill or block edits to that reminder.
+CREATE OR REPLACE FUNCTION reminders_parse_scheduled_at(reminder_date TEXT, reminder_time TEXT)
+RETURNS TIMESTAMP WITH TIME ZONE AS $$
+BEGIN
+    RETURN to_timestamp(reminder_date || ' ' || reminder_time, 'DD Mon YYYY HH12:MI AM');
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION reminders_set_scheduled_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- The API sends scheduled_at on insert (already parsed while validating);
+    -- only derive it here when it's missing or date/time are being changed
+    IF TG_OP = 'INSERT' AND NEW.scheduled_at IS NOT NULL THEN
+        RETURN NEW;
+    END IF;
+    NEW.scheduled_at := reminders_parse_scheduled_at(NEW.date, NEW.time);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_reminders_scheduled_at ON reminders;
+CREATE TRIGGER trg_reminders_scheduled_at
+    BEFORE INSERT OR UPDATE OF date, time ON reminders
+    FOR EACH ROW EXECUTE FUNCTION reminders_set_scheduled_at();
+
+-- Backfill rows created before the column existed
+UPDATE reminders
+SET scheduled_at = reminders_parse_scheduled_at(date, time)
+WHERE scheduled_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_reminders_pair_scheduled ON reminders(pair_id, scheduled_at);
+
+-- Trigram index so title ILIKE '%...%' lookups don't scan every reminder
+CREATE INDEX IF NOT EXISTS idx_reminders_title_trgm ON reminders USING gin (title gin_trgm_ops);
+
+-- Delete a reminder by (case-insensitive, partial) title in a single round trip.
+-- Returns every matching row; the row is only deleted when exactly one matches,
+-- otherwise nothing is deleted and `deleted` is false so the caller can ask the
+-- patient to be more specific.
+CREATE OR REPLACE FUNCTION delete_reminder_by_title(p_pair UUID, p_needle TEXT)
+RETURNS TABLE (id INTEGER, title TEXT, date TEXT, "time" TEXT, deleted BOOLEAN)
+LANGUAGE sql
+AS $$
+    WITH matches AS (
+        SELECT r.id, r.title, r.date, r.time
+        FROM reminders r
+        WHERE r.pair_id = p_pair
+        AND r.title ILIKE '%' || replace(replace(replace(p_needle, '\', '\\'), '%', '\%'), '_', '\_') || '%'
+    ),
+    removed AS (
+        DELETE FROM reminders r
+        WHERE r.id IN (SELECT m.id FROM matches m)
+        AND (SELECT count(*) FROM matches) = 1
+        RETURNING r.id
+    )
+    SELECT m.id, m.title, m.date, m.time, EXISTS (SELECT 1 FROM removed) AS deleted
+    FROM matches m;
+$$;
+
 -- ===== PEOPLE TABLE =====
 -- Stores people enrolled in face recognition
 CREATE TABLE IF NOT EXISTS people (
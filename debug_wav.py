@@ -0,0 +1,22 @@
+"""
+Debug WAV writer shared by the microphone test scripts
+"""
+import io
+import os
+import scipy.io.wavfile as wavfile
+import numpy as np
+
+
+def save_debug_wav(path, sample_rate, audio, int16_buf):
+    """Write float32 audio as a 16-bit WAV: scale into int16_buf, build in memory, one write"""
+    pcm = int16_buf[:len(audio)]
+    np.multiply(audio, 32767.0, out=pcm, casting='unsafe')
+
+    wav_bytes = io.BytesIO()
+    wavfile.write(wav_bytes, sample_rate, pcm)
+
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        os.write(fd, wav_bytes.getbuffer())
+    finally:
+        os.close(fd)
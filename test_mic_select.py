@@ -1,20 +1,64 @@
 """
 Select and test microphone
+
+Usage: python test_mic_select.py [--refresh-devices]
 """
+import json
 import os
 import sys
+from pathlib import Path
 import sounddevice as sd
-import scipy.io.wavfile as wavfile
 import numpy as np
 import time
 
+# Add the app directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from debug_wav import save_debug_wav
+
+# Set SAVE_DEBUG_WAV=1 to also write the recording to a WAV file
+SAVE_DEBUG_WAV = os.getenv("SAVE_DEBUG_WAV", "").lower() in ("1", "true", "yes")
+
+
+# Device list is cached for an hour (enumerating audio endpoints is slow on Windows)
+DEVICE_CACHE_FILE = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "cogni_anchor" / "devices.json"
+DEVICE_CACHE_TTL = 3600  # seconds
+
+
+def load_devices(refresh=False):
+    """Return sd.query_devices() as a list of dicts, from the cache if it's fresh"""
+    portaudio_version = sd.get_portaudio_version()[1]
+
+    if not refresh:
+        try:
+            if time.time() - DEVICE_CACHE_FILE.stat().st_mtime < DEVICE_CACHE_TTL:
+                cached = json.loads(DEVICE_CACHE_FILE.read_text(encoding="utf-8"))
+                if cached.get("portaudio_version") == portaudio_version:
+                    return cached["devices"]
+        except (OSError, ValueError, KeyError):
+            pass  # Missing or unreadable cache: query the devices
+
+    devices = [dict(device) for device in sd.query_devices()]
+
+    try:
+        DEVICE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        DEVICE_CACHE_FILE.write_text(
+            json.dumps({"portaudio_version": portaudio_version, "devices": devices}),
+            encoding="utf-8"
+        )
+    except OSError as e:
+        print(f"⚠️  Could not cache device list: {e}")
+
+    return devices
+
+
 if sys.platform == 'win32':
     import codecs
     sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
 
 print("Available INPUT devices:")
 print("-" * 60)
-devices = sd.query_devices()
+devices = load_devices(refresh="--refresh-devices" in sys.argv)
 input_devices = []
 for i, device in enumerate(devices):
     if device['max_input_channels'] > 0:
@@ -22,8 +66,18 @@ for i, device in enumerate(devices):
         input_devices.append(i)
 
 print("-" * 60)
+print("(Device list is cached for an hour - run with --refresh-devices after plugging in a mic)")
 device_id = int(input("Enter device number to test (try 2 for Realtek): "))
 
+# Load Whisper once, before recording, so transcription doesn't wait on it
+print("Loading Whisper model...")
+from app.services.local_whisper_service import load_whisper_model
+# GPU float16 / CPU int8 (or STT_COMPUTE_TYPE), same selection as the app
+model = load_whisper_model("base")
+if model is None:
+    print("✗ Failed to load Whisper model")
+    sys.exit(1)
+
 print(f"\nUsing device: {devices[device_id]['name']}")
 print("Recording for 3 seconds in 3... 2... 1...")
 time.sleep(3)
@@ -32,27 +86,33 @@ print("🎤 SPEAK NOW!")
 duration = 3
 sample_rate = 16000
 
+# Reused int16 scratch buffer for the debug WAV
+int16_buf = np.empty(int(duration * sample_rate), dtype=np.int16)
+
+# Record straight into float32 at 16 kHz (Whisper's native input, no WAV/ffmpeg round trip)
 audio_data = sd.rec(int(duration * sample_rate),
                    samplerate=sample_rate,
                    channels=1,
-                   dtype='int16',
+                   dtype='float32',
                    device=device_id)
 sd.wait()
+audio_data = audio_data[:, 0]
 
-os.makedirs("test_audio_files", exist_ok=True)
-test_file = "test_audio_files/selected_mic_test.wav"
-wavfile.write(test_file, sample_rate, audio_data)
-
-max_amp = np.max(np.abs(audio_data))
+# Peak via two reductions (no temporary abs() array)
+max_amp = max(float(audio_data.max()), -float(audio_data.min()))
 print(f"\n✓ Recording complete!")
-print(f"  Max amplitude: {max_amp} (should be > 1000 for good audio)")
-print(f"  File: {test_file}")
+print(f"  Max amplitude: {max_amp:.3f} (should be > 0.03 for good audio)")
+
+if SAVE_DEBUG_WAV:
+    os.makedirs("test_audio_files", exist_ok=True)
+    test_file = "test_audio_files/selected_mic_test.wav"
+    save_debug_wav(test_file, sample_rate, audio_data, int16_buf)
+    print(f"  File: {test_file}")
 
-if max_amp > 1000:
+if max_amp > 0.03:
     print("✓ Good volume! Transcribing...")
-    import whisper
-    model = whisper.load_model("base")
-    result = model.transcribe(test_file, language="en", fp16=False)
-    print(f"\nTranscription: '{result['text']}'")
+    segments, _ = model.transcribe(audio_data, language="en", beam_size=1)
+    text = "".join(segment.text for segment in segments).strip()
+    print(f"\nTranscription: '{text}'")
 else:
     print("⚠️  Volume too low! Increase microphone volume in Windows settings")
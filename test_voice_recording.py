@@ -1,13 +1,23 @@
 """
 Test voice recording and transcription with a real microphone
+(transcribes while recording, using the streaming local Whisper transcriber)
 """
 import os
 import sys
 import time
+import queue
 import sounddevice as sd
-import scipy.io.wavfile as wavfile
 import numpy as np
 
+# Add the app directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from debug_wav import save_debug_wav
+
+# Set SAVE_DEBUG_WAV=1 to also write the recording to a WAV file
+SAVE_DEBUG_WAV = os.getenv("SAVE_DEBUG_WAV", "").lower() in ("1", "true", "yes")
+
+
 # Fix Windows console encoding
 if sys.platform == 'win32':
     import codecs
@@ -21,12 +31,23 @@ print("=" * 60)
 print("\n[Test 1] Available audio devices:")
 print(sd.query_devices())
 
-# Test 2: Record from microphone
+# Load Whisper up front so the model load isn't part of the record/transcribe loop
+print("\nLoading Whisper model...")
+try:
+    from app.services.stt_service import StreamingTranscriber
+    transcriber = StreamingTranscriber()
+    print("✓ Model loaded")
+except Exception as e:
+    print(f"✗ Failed to load Whisper model: {e}")
+    sys.exit(1)
+
+# Test 2: Record from microphone and transcribe as we go
 print("\n[Test 2] Recording from microphone...")
 print("Speak now for 5 seconds!")
 
 duration = 5  # seconds
 sample_rate = 16000  # Whisper expects 16kHz
+block_size = 1600  # 100 ms per callback
 
 print(f"Recording for {duration} seconds...")
 print("3...")
@@ -37,29 +58,77 @@ print("1...")
 time.sleep(1)
 print("🎤 RECORDING NOW - Speak clearly!")
 
+# The audio callback runs on PortAudio's thread: just hand blocks to the main loop
+audio_queue = queue.Queue()
+
+
+def audio_callback(indata, frames, time_info, status):
+    if status:
+        print(f"⚠️  {status}")
+    audio_queue.put(indata[:, 0].copy())
+
+
+# Whole recording in float32 (Whisper's native input), filled as blocks arrive
+audio_data = np.zeros(duration * sample_rate, dtype=np.float32)
+# Reused int16 scratch buffer for the debug WAV
+int16_buf = np.empty(duration * sample_rate, dtype=np.int16)
+recorded = 0
+transcription = ""
+
+
+def store_chunk(chunk):
+    """Copy a block into the recording buffer (blocks past the end are dropped)"""
+    global recorded
+    n = min(len(chunk), len(audio_data) - recorded)
+    audio_data[recorded:recorded + n] = chunk[:n]
+    recorded += n
+
+
 try:
-    # Record audio
-    audio_data = sd.rec(int(duration * sample_rate),
-                       samplerate=sample_rate,
-                       channels=1,
-                       dtype='int16')
-    sd.wait()  # Wait until recording is finished
+    with sd.InputStream(samplerate=sample_rate,
+                        channels=1,
+                        dtype='float32',
+                        blocksize=block_size,
+                        callback=audio_callback):
+        end_time = time.time() + duration
+        while time.time() < end_time:
+            try:
+                chunk = audio_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            store_chunk(chunk)
+
+            # Confirmed words appear while you're still speaking
+            confirmed = transcriber.feed_chunk(chunk)
+            if confirmed:
+                transcription += confirmed
+                print(f"  ...{confirmed}", flush=True)
+
+    # Drain blocks that arrived after the deadline
+    while not audio_queue.empty():
+        chunk = audio_queue.get_nowait()
+        store_chunk(chunk)
+        transcription += transcriber.feed_chunk(chunk)
 
     print("✓ Recording complete!")
 
-    # Save to file
-    os.makedirs("test_audio_files", exist_ok=True)
-    test_file = "test_audio_files/microphone_test.wav"
-    wavfile.write(test_file, sample_rate, audio_data)
+    audio_data = audio_data[:recorded]
 
-    print(f"✓ Saved to: {test_file}")
-    print(f"  File size: {os.path.getsize(test_file)} bytes")
+    # Save to file (debug only)
+    if SAVE_DEBUG_WAV:
+        os.makedirs("test_audio_files", exist_ok=True)
+        test_file = "test_audio_files/microphone_test.wav"
+        save_debug_wav(test_file, sample_rate, audio_data, int16_buf)
 
-    # Check if audio is not silent
-    max_amplitude = np.max(np.abs(audio_data))
-    print(f"  Max amplitude: {max_amplitude}")
+        print(f"✓ Saved to: {test_file}")
+        print(f"  File size: {os.path.getsize(test_file)} bytes")
 
-    if max_amplitude < 100:
+    # Check if audio is not silent (peak via two reductions, no temporary abs() array)
+    max_amplitude = max(float(audio_data.max()), -float(audio_data.min())) if len(audio_data) else 0.0
+    print(f"  Max amplitude: {max_amplitude:.4f}")
+
+    if max_amplitude < 0.003:
         print("⚠️  WARNING: Audio is very quiet or silent!")
         print("   Check your microphone settings or speak louder")
     else:
@@ -70,20 +139,12 @@ except Exception as e:
     print("Make sure you have a working microphone!")
     sys.exit(1)
 
-# Test 3: Transcribe with Whisper
-print("\n[Test 3] Transcribing with Whisper...")
+# Test 3: Finish the streaming transcription
+print("\n[Test 3] Finishing transcription...")
 
 try:
-    import whisper
-
-    print("Loading Whisper model...")
-    model = whisper.load_model("base")
-    print("✓ Model loaded")
-
-    print(f"Transcribing {test_file}...")
-    result = model.transcribe(test_file, language="en", fp16=False)
-
-    transcription = result["text"].strip()
+    transcription = (transcription + transcriber.flush()).strip()
+    transcriber.close()
 
     print("\n" + "=" * 60)
     print("TRANSCRIPTION RESULT:")
@@ -105,5 +166,6 @@ except Exception as e:
     traceback.print_exc()
 
 print("\n✓ Test complete!")
-print(f"Audio file saved at: {os.path.abspath(test_file)}")
-print("You can manually check this file to verify the recording worked.")
+if SAVE_DEBUG_WAV:
+    print(f"Audio file saved at: {os.path.abspath(test_file)}")
+    print("You can manually check this file to verify the recording worked.")
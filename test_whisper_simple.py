@@ -3,8 +3,13 @@ Simple Whisper test - no FastAPI, no async, just pure Python
 """
 import os
 import sys
-import whisper
+import struct
 import time
+from faster_whisper import decode_audio
+
+# Add the app directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+from app.services.local_whisper_service import load_whisper_model
 
 # Fix Windows console encoding
 if sys.platform == 'win32':
@@ -23,23 +28,15 @@ os.makedirs(test_dir, exist_ok=True)
 test_file = os.path.join(test_dir, "test.wav")
 
 # Create a dummy WAV file (empty for now)
+# Minimal 44-byte PCM header: 16 kHz, mono, 16-bit, no samples
+header = struct.pack(
+    '<4sI4s4sIHHIIHH4sI',
+    b'RIFF', 36, b'WAVE',
+    b'fmt ', 16, 1, 1, 16000, 32000, 2, 16,
+    b'data', 0
+)
 with open(test_file, 'wb') as f:
-    # Write minimal WAV header (44 bytes)
-    f.write(b'RIFF')
-    f.write((36).to_bytes(4, 'little'))
-    f.write(b'WAVE')
-    f.write(b'fmt ')
-    f.write((16).to_bytes(4, 'little'))
-    f.write((1).to_bytes(2, 'little'))  # PCM
-    f.write((1).to_bytes(2, 'little'))  # Mono
-    f.write((16000).to_bytes(4, 'little'))  # Sample rate
-    f.write((32000).to_bytes(4, 'little'))  # Byte rate
-    f.write((2).to_bytes(2, 'little'))  # Block align
-    f.write((16).to_bytes(2, 'little'))  # Bits per sample
-    f.write(b'data')
-    f.write((0).to_bytes(4, 'little'))  # Data size
-    f.flush()
-    os.fsync(f.fileno())
+    f.write(header)
 
 print(f"✓ Created: {test_file}")
 
@@ -55,7 +52,10 @@ else:
 # Test 2: Load Whisper model
 print("\n[Test 2] Loading Whisper model...")
 try:
-    model = whisper.load_model("base")
+    # GPU float16 / CPU int8 (or STT_COMPUTE_TYPE), same selection as the app
+    model = load_whisper_model("base")
+    if model is None:
+        raise RuntimeError("see log above")
     print("✓ Whisper model loaded successfully")
 except Exception as e:
     print(f"✗ Failed to load model: {e}")
@@ -68,7 +68,7 @@ try:
     print(f"  File exists: {os.path.exists(test_file)}")
     print(f"  File size: {os.path.getsize(test_file)} bytes")
 
-    audio_array = whisper.load_audio(test_file)
+    audio_array = decode_audio(test_file)
     print(f"✓ Audio loaded into memory")
     print(f"  Array shape: {audio_array.shape}")
 except FileNotFoundError as e:
@@ -83,8 +83,9 @@ except Exception as e:
 
 print("\n[Test 4] Transcribing (this will fail with empty audio but that's OK)...")
 try:
-    result = model.transcribe(audio_array, language="en", fp16=False)
-    print(f"✓ Transcription completed: '{result['text']}'")
+    segments, _ = model.transcribe(audio_array, language="en", beam_size=1)
+    text = "".join(segment.text for segment in segments)
+    print(f"✓ Transcription completed: '{text}'")
 except Exception as e:
     print(f"✓ Expected error (empty audio): {e}")
 